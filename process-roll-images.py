@@ -22,123 +22,42 @@ expressionized MIDI files.
 """
 
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from csv import DictReader
+from email.utils import formatdate
+from functools import lru_cache, partial
 import json
 import logging
+import mmap
+import multiprocessing
 import os
 from pathlib import Path
-import re
 from shutil import copyfileobj
+import subprocess
+import threading
 
 from lxml import etree
-from openjpeg import decode  # Necessary to read JPEG2000s
-from PIL import Image
+import numpy as np
+from openjpeg import decode, get_parameters  # Necessary to read JPEG2000s
 import requests
-
-# Otherwise Pillow will refuse to open large images
-Image.MAX_IMAGE_PIXELS = None
-
-# As new types are added to the collection, their shorthands must be added here
-ROLL_TYPES = [
-    "welte-red",
-    "88-note",
-    "65-note",
-    "welte-green",
-    "welte-licensee",
-    "duo-art",
-]
-
-ROLL_TYPE_ENTRIES = {
-    "Welte-Mignon red roll (T-100)": "welte-red",
-    "Welte-Mignon red roll (T-100).": "welte-red",
-    "Welte-Mignon red roll (T-100)..": "welte-red",
-    "Scale: 88n": "88-note",
-    "Scale: 88n.": "88-note",
-    "Scale: 65n.": "65-note",
-    "88n": "88-note",
-    "65n": "65-note",
-    "standard": "88-note",
-    "non-reproducing": "88-note",
-    "Welte-Mignon green roll (T-98)": "welte-green",
-    "Welte-Mignon green roll (T-98).": "welte-green",
-    "Welte-Mignon licensee roll": "welte-licensee",
-    "Welte-Mignon licensee roll.": "welte-licensee",
-    "Welte-Mignon licensee roll (T-98).": "welte-licensee",
-    "Duo-Art piano rolls": "duo-art",
-    "Duo-Art piano rolls.": "duo-art",
-}
-
-# The downloadable full-resolution monochome TIFF images of several rolls were
-# erroneously mirrored left-right (so that the bass perforations are on the
-# right side of the image). There may be others like this...
-REVERSED_IMAGES = [
-    "yt837kd6607",
-    "ws749sk4778",
-    "hs635sh6729",
-    "zw485gh6070",
-    "xr682fm1233",
-    "mx460bt7026",
-    "cs175wr2428",
-    "bz327kz4744",
-    "wv912mm2332",
-    "jw822wm2644",
-    "fv104hn7521",
-    "fy803vj4057",
-    "kz379jn2491",
-]
-
-# This overrides the --ignore_rewind_hole command line switch; both are used
-# to ignore the detected rewind hole position for a roll when assigning MIDI
-# numbers to hole columns (tracker bar positions); the rewind hole position
-# can be detected incorrectly due to test patterns at the end of the roll,
-# conjoined rolls, or spurious holes, and sometimes it's better to ignore it
-# and hope the other alignment methods will assign the MIDI numbers correctly.
-IGNORE_REWIND_HOLE = [
-    "mh156nr8259",
-    "cd381jt9273",
-    "qw257qp8232",
-    "tg593zw7367",
-    "cf814vt1322",
-    "ct641rb1417",
-    "cm852bp8620",
-    "cs175wr2428",
-    "ft113cg5195",
-    "pk349zj4179",
-    "pf050rx0162",
-    "rd899zb5188",
-    "ty382mw3181",
-    "hj286gj0705",
-    "sh954gz9635",
-    "wb477ky1555",
-    "tj759sv4290",
-    "xk327pf9243",
-    "pz737tz3677",
-    "yj176wj3359",
-    "pp228yz4317",
-]
-
-# This can be used in a last-ditch attempt to strongarm a roll's tracker
-# alignment after all of the other methods has been run. Negative values
-# shift the tracker assignments left, positives to the right.
-MANUAL_ALIGNMENT_CORRECTIONS = {}
-
-# These are either duplicates of existing rolls, or rolls that are listed in
-# DRUIDs files but have disappeared from the catalog, or rolls that were
-# accessioned incorrectly (hm136vg1420)
-# Note: All Duo-Art rolls are currently unusable because their primary images
-# are upside-down on the server.
-ROLLS_TO_SKIP = [
-    "rr052wh1991",  # Duplicate of gn803sk7089
-    "hm136vg1420",  # Incorrectly mirrored, but replaced by rg676ym0376 - should be de-accessioned
-    "df354sy6634",  # Needs to be flipped vertically
-    "xc735nd8093",  # Needs to be flipped vertically
-    "sh954gz9635",  # Large section of white paper from repair makes it unparsable
-    "wb477ky1555",  # Green W incorrectly cataloged as Red
-    "pz737tz3677",  # Licensee incorrectly cataloged as Green
-    "yj176wj3359",  # Licensee incorrectly cataloged as Green
-    "sm367hr9769",  # Image(s) seem to be corrupted
-    "sj617nc3041",  # All images erroneously mirrored left-right
-]
+from requests.adapters import HTTPAdapter
+import tifffile
+from urllib3.util.retry import Retry
+
+from roll_constants import (
+    IGNORE_REWIND_HOLE,
+    MANUAL_ALIGNMENT_CORRECTIONS,
+    REVERSED_IMAGES,
+    ROLL_TYPE_ENTRIES,
+    ROLL_TYPES,
+    ROLLS_TO_SKIP,
+)
+
+try:
+    # Optional, but much faster than the json module at parsing manifests
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 TIFF2HOLES = "../roll-image-parser/bin/tiff2holes"
 BINASC = "../binasc/binasc"
@@ -146,97 +65,288 @@ MIDI2EXP = "../midi2exp/bin/midi2exp"
 
 PURL_BASE = "https://purl.stanford.edu/"
 
+# The (filename suffix, format) combinations of IIIF manifest renderings that
+# can be used as the roll image, most preferred first
+IMAGE_RENDERING_PREFERENCES = [
+    ("_ir_sp.jp2", "image/jp2"),
+    ("_gs.jp2", "image/jp2"),
+    ("_gr.tiff", "image/tiff"),
+    ("_gr.tif", "image/tiff"),
+    ("_gr.tiff", "image/x-tiff-big"),
+    ("_gr.tif", "image/x-tiff-big"),
+]
+
 NS = {"x": "http://www.loc.gov/mods/v3"}
 
+MODS_TAG = f"{{{NS['x']}}}mods"
+
+# Holds per-thread state, e.g., each thread's XML parser (lxml parser objects
+# should not be used from more than one thread)
+THREAD_STATE = threading.local()
+
+# XPath queries for the MODS notes that describe a roll's type, compiled once
+# rather than on every call
+ROLL_TYPE_NOTE_XPATH = etree.XPath(
+    "x:physicalDescription/x:note[@displayLabel='Roll type']/text()", namespaces=NS
+)
+SCALE_NOTE_XPATH = etree.XPath(
+    "x:physicalDescription/x:note[@displayLabel='Scale']/text()", namespaces=NS
+)
+NOTES_XPATH = etree.XPath("x:note", namespaces=NS)
+
+# The header lines of the sections of the tiff2holes analysis output that
+# contain the binasc-encoded raw (one MIDI message per perforation) and note
+# MIDI data. Each section runs until the next "@" header line or the end of
+# the file.
+ANALYSIS_MIDI_SECTIONS = {"@HOLE_MIDIFILE:": "raw", "@MIDIFILE:": "note"}
+
+# Buffer size used when streaming roll images (often hundreds of MB) to disk;
+# larger reads and writes mean fewer system calls per image
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Number of threads used to download metadata files concurrently; the HTTP
+# connection pool is sized to match
+PREFETCH_THREADS = 16
+
+# Roll images of at least this size are downloaded in this many parts over
+# parallel connections, if the server accepts range requests
+PARALLEL_DOWNLOAD_MIN_SIZE = 64 * 1024 * 1024
+PARALLEL_DOWNLOAD_PARTS = 4
+
+# Number of threads used to download roll images ahead of their conversion,
+# parsing and MIDI generation (in the worker processes), so that the network
+# transfers for the next rolls overlap the processing of the current ones
+IMAGE_DOWNLOAD_THREADS = 2
+
+# Roll images (or memory maps of uncompressed ones) are mirrored in place, in
+# blocks of rows of about this many bytes, so that only one block needs to be
+# copied at a time
+FLIP_BLOCK_SIZE = 64 * 1024 * 1024
+
+# Maps each byte value to the byte with its bits in reverse order, used to
+# mirror the rows of 1-bit images without unpacking them
+BIT_REVERSED_BYTES = np.array(
+    [int(f"{value:08b}"[::-1], 2) for value in range(256)], dtype=np.uint8
+)
+
+# A single session per process lets all requests to the Stanford Digital
+# Repository reuse pooled connections rather than opening a new TCP/TLS
+# connection per request; it is created by init_worker()
+SESSION = None
+
+
+def init_worker():
+    """Sets up the per-process state needed for processing rolls: logging and
+    the shared HTTP session. This runs in the main process and at the start of
+    each worker process; workers are spawned rather than forked, so that they
+    don't inherit copies of the parent's network connections and lxml state."""
+
+    global SESSION
 
-def get_roll_type_for_druid(druid, redownload_xml):
-    """Obtains a .xml metadata file for the roll specified by DRUID     either
-    from the local xml/ folder or the Stanford Digital Repository, then
-    parses the XML to build the metadata dictionary for the roll.
-    """
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
-    def get_value_by_xpath(xpath):
-        try:
-            return xml_tree.xpath(
-                xpath,
-                namespaces=NS,
-            )[0]
-        except IndexError:
-            return None
+    SESSION = requests.Session()
+    SESSION.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=PREFETCH_THREADS,
+            pool_maxsize=PREFETCH_THREADS,
+            max_retries=Retry(
+                total=5, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)
+            ),
+        ),
+    )
 
-    xml_filepath = Path(f"xml/{druid}.xml")
 
-    if not xml_filepath.exists() or redownload_xml:
-        response = requests.get(f"{PURL_BASE}{druid}.xml")
-        xml_data = response.text
-        with xml_filepath.open("w", encoding="utf-8") as _fh:
-            _fh.write(xml_data)
-    else:
-        xml_data = xml_filepath.open("r", encoding="utf-8").read()
+def get_xml_parser():
+    """Returns the calling thread's lxml parser for XML metadata records,
+    creating it on first use so that the parser is reused across records.
+    Parsing is lenient, and whitespace-only text is dropped to keep the trees
+    small."""
+
+    parser = getattr(THREAD_STATE, "xml_parser", None)
+    if parser is None:
+        parser = etree.XMLParser(recover=True, huge_tree=True, remove_blank_text=True)
+        THREAD_STATE.xml_parser = parser
+    return parser
+
+
+def get_validators_filepath(filepath):
+    """Returns the path of the sidecar file that stores the HTTP cache
+    validators (ETag and Last-Modified) for the downloaded file at filepath."""
+
+    return filepath.with_name(f"{filepath.name}.meta")
+
+
+def save_cache_validators(filepath, response):
+    """Records the ETag and Last-Modified headers of the response that the file
+    at filepath was downloaded from, so the local copy can be revalidated with
+    the server later."""
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    get_validators_filepath(filepath).write_text(json.dumps(validators))
 
+
+def normalize_note_text(text):
+    """Strips trailing periods and surrounding whitespace from the text of a
+    MODS note, so that it can be looked up in ROLL_TYPE_ENTRIES."""
+
+    return text.rstrip(". ").strip() if text else text
+
+
+def get_conditional_headers(filepath, use_mtime=True):
+    """Returns HTTP request headers asking the server to send the resource only
+    if it has changed since the local copy at filepath was downloaded (no
+    headers are needed if there is no local copy). The validators saved with
+    the download are used if available, otherwise (if use_mtime is set) the
+    file's mtime."""
+
+    if not filepath.exists():
+        return {}
+    headers = {}
+    validators_filepath = get_validators_filepath(filepath)
+    if validators_filepath.exists():
+        validators = json.loads(validators_filepath.read_bytes())
+        if validators.get("etag") is not None:
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified") is not None:
+            headers["If-Modified-Since"] = validators["last_modified"]
+    if use_mtime and "If-Modified-Since" not in headers:
+        headers["If-Modified-Since"] = formatdate(filepath.stat().st_mtime, usegmt=True)
+    return headers
+
+
+@lru_cache(maxsize=None)
+def load_mods_tree(druid):
+    """Parses the cached xml/DRUID.xml metadata file for the roll specified by
+    DRUID and returns its MODS element, or None if the file can't be parsed.
+    Results are memoized, so repeat lookups for a DRUID don't re-read or
+    re-parse the file; call load_mods_tree.cache_clear() after downloading a
+    new copy."""
+
+    # The whole record is parsed (leniently) and the MODS element located in
+    # the tree, rather than cutting the MODS section out of the text first
+    xml_data = Path(f"xml/{druid}.xml").read_bytes()
     try:
-        mods_xml = (
-            "<mods" + xml_data.split(r"<mods")[1].split(r"</mods>")[0] + "</mods>"
-        )
-        xml_tree = etree.fromstring(mods_xml)
+        xml_root = etree.fromstring(xml_data, get_xml_parser())
     except etree.XMLSyntaxError:
+        xml_root = None
+    mods_tree = None if xml_root is None else next(xml_root.iter(MODS_TAG), None)
+    if mods_tree is None:
         logging.error(
             f"Unable to parse XML metadata for {druid} - record is likely missing."
         )
+    return mods_tree
+
+
+@lru_cache(maxsize=None)
+def load_iiif_manifest(druid):
+    """Parses the cached manifests/DRUID.json IIIF manifest for the roll
+    specified by DRUID into a dictionary. Results are memoized; call
+    load_iiif_manifest.cache_clear() after downloading a new copy."""
+
+    return json_loads(Path(f"manifests/{druid}.json").read_bytes())
+
+
+def download_xml(druid):
+    """Downloads the .xml metadata file for the roll specified by DRUID from
+    the Stanford Digital Repository to the local xml/ folder, unless the
+    server reports that the cached copy is still current."""
+
+    xml_filepath = Path(f"xml/{druid}.xml")
+    response = SESSION.get(
+        f"{PURL_BASE}{druid}.xml", headers=get_conditional_headers(xml_filepath)
+    )
+    if response.status_code != 304:
+        # Saved as received; the parser reads the encoding declaration
+        xml_filepath.write_bytes(response.content)
+        save_cache_validators(xml_filepath, response)
+        load_mods_tree.cache_clear()
+
+
+def download_iiif_manifest(druid):
+    """Downloads the IIIF manifest for the roll specified by DRUID from the
+    Stanford Digital Repository to the local manifests/ folder (unless the
+    server reports that the cached copy is still current) and returns it
+    parsed into a dictionary. If the download fails, the cached copy (if any)
+    is returned instead, otherwise None."""
+
+    iiif_filepath = Path(f"manifests/{druid}.json")
+    try:
+        response = SESSION.get(
+            f"{PURL_BASE}{druid}/iiif/manifest",
+            headers=get_conditional_headers(iiif_filepath),
+        )
+        if response.status_code == 304:
+            return load_iiif_manifest(druid)
+        # The manifest is cached exactly as it was received, which saves
+        # serializing it again
+        iiif_manifest = json_loads(response.content)
+        iiif_filepath.write_bytes(response.content)
+        save_cache_validators(iiif_filepath, response)
+        load_iiif_manifest.cache_clear()
+    except Exception as e:
+        logging.info(f"Unable to download IIIF manifest for {druid}")
+        iiif_manifest = None
+        if iiif_filepath.exists():
+            logging.info(f"Using cached IIIF manifest {iiif_filepath}")
+            iiif_manifest = load_iiif_manifest(druid)
+    return iiif_manifest
+
+
+def get_roll_type_for_druid(druid, redownload_xml):
+    """Obtains a .xml metadata file for the roll specified by DRUID     either
+    from the local xml/ folder or the Stanford Digital Repository, then
+    parses the XML to build the metadata dictionary for the roll.
+    """
+
+    def get_first_result(xpath):
+        results = xpath(xml_tree)
+        return results[0] if results else None
+
+    if redownload_xml or not Path(f"xml/{druid}.xml").exists():
+        download_xml(druid)
+
+    xml_tree = load_mods_tree(druid)
+    if xml_tree is None:
         return None
 
     # The representation of the roll type in the MODS metadata continues to
     # evolve. Hopefully this logic covers all cases.
-    roll_type = "NA"
-    type_note = get_value_by_xpath(
-        "x:physicalDescription/x:note[@displayLabel='Roll type']/text()"
-    )
-    scale_note = get_value_by_xpath(
-        "x:physicalDescription/x:note[@displayLabel='Scale']/text()"
-    )
-    if type_note is not None and type_note in ROLL_TYPE_ENTRIES:
-        roll_type = ROLL_TYPE_ENTRIES[type_note]
+    type_note = normalize_note_text(get_first_result(ROLL_TYPE_NOTE_XPATH))
+    scale_note = normalize_note_text(get_first_result(SCALE_NOTE_XPATH))
+    roll_type = ROLL_TYPE_ENTRIES.get(type_note, "NA")
 
-    if (
-        scale_note is not None
-        and scale_note in ROLL_TYPE_ENTRIES
-        and (roll_type == "NA" or type_note == "standard")
-    ):
-        roll_type = ROLL_TYPE_ENTRIES[scale_note]
+    scale_type = ROLL_TYPE_ENTRIES.get(scale_note)
+    if scale_type is not None and (roll_type == "NA" or type_note == "standard"):
+        roll_type = scale_type
 
     if roll_type == "NA" or type_note == "standard":
-        for note in xml_tree.xpath("(x:note)", namespaces=NS):
-            if (
-                note is not None
-                and note.text in ROLL_TYPE_ENTRIES
+        for note in NOTES_XPATH(xml_tree):
+            note_type = ROLL_TYPE_ENTRIES.get(normalize_note_text(note.text))
+            if note_type is not None and (
                 # Most rolls of any type are marked as "88n", so don't let this
                 # setting overwrite a more specific roll type note.
-                and (ROLL_TYPE_ENTRIES[note.text] != "88-note" or roll_type == "NA")
+                note_type != "88-note"
+                or roll_type == "NA"
             ):
-                roll_type = ROLL_TYPE_ENTRIES[note.text]
+                roll_type = note_type
 
     return roll_type
 
 
-def get_iiif_manifest(druid, redownload_manifests=True):
+def get_iiif_manifest(druid, redownload_manifests=False):
     """If the IIIF manifest file (.json format) is not present in manifests/
     or the redownload_manifests parameters is set, downloads it from the
     Stanford Digital Repository. The manifest is then parsed into a
     dictionary."""
 
-    iiif_filepath = Path(f"manifests/{druid}.json")
-    if iiif_filepath.exists() and not redownload_manifests:
-        iiif_manifest = json.load(open(iiif_filepath, "r"))
-    else:
-        try:
-            response = requests.get(f"{PURL_BASE}{druid}/iiif/manifest")
-            iiif_manifest = response.json()
-            with iiif_filepath.open("w") as _fh:
-                json.dump(iiif_manifest, _fh)
-        except Exception as e:
-            logging.info(f"Unable to download IIIF manifest for {druid}")
-            iiif_manifest = None
-    return iiif_manifest
+    if not redownload_manifests and Path(f"manifests/{druid}.json").exists():
+        return load_iiif_manifest(druid)
+    return download_iiif_manifest(druid)
 
 
 def get_image_url(iiif_manifest):
@@ -274,20 +384,27 @@ def get_image_url(iiif_manifest):
             elif "@id" in renderings[0]:
                 return renderings[0]["@id"]
 
+        # Otherwise pick the most preferred of the renderings
+        image_url = None
+        best_preference = len(IMAGE_RENDERING_PREFERENCES)
         for rendering in renderings:
-            if (
-                rendering["@id"].endswith("_ir_sp.jp2")
-                or rendering["@id"].endswith("_gs.jp2")
-            ) and rendering["format"] == "image/jp2":
-                return rendering["@id"]
-            if (
-                rendering["@id"].endswith("_gr.tiff")
-                or rendering["@id"].endswith("_gr.tif")
-            ) and (
-                rendering["format"] == "image/tiff"
-                or rendering["format"] == "image/x-tiff-big"
-            ):
-                return rendering["@id"]
+            rendering_id = rendering.get("@id", "")
+            preference = next(
+                (
+                    i
+                    for i, (suffix, image_format) in enumerate(
+                        IMAGE_RENDERING_PREFERENCES[:best_preference]
+                    )
+                    if rendering_id.endswith(suffix)
+                    and rendering.get("format") == image_format
+                ),
+                None,
+            )
+            if preference is not None:
+                image_url = rendering_id
+                best_preference = preference
+        if image_url is not None:
+            return image_url
 
     logging.error("Unable to find image URL in IIIF manifest")
     return None
@@ -322,15 +439,28 @@ def get_druids_from_txt_file(druids_fp):
     return druids_list
 
 
-def request_image(image_url):
+def request_image(image_url, image_filepath):
     """Attempts to download the file at the URL specified and, if available,
-    returns it as a raw response object."""
+    returns it as a raw response object. If a copy of the image already exists
+    at image_filepath, the download only proceeds if the image on the server
+    has been modified since then; otherwise the (empty) 304 Not Modified
+    response is returned."""
 
     if image_url is None:
         logging.error("Image URL is None")
         return None
     logging.info(f"Downloading roll image {image_url}")
-    response = requests.get(image_url, stream=True)
+    # An image without saved validators may be left over from an interrupted
+    # download by an older version of this script, so it isn't revalidated by
+    # its mtime
+    response = SESSION.get(
+        image_url,
+        stream=True,
+        headers=get_conditional_headers(image_filepath, use_mtime=False),
+    )
+    if response.status_code == 304:
+        logging.info(f"Roll image {image_url} has not changed since last download")
+        return response
     if response.status_code == 200:
         response.raw.decode_content = True
         return response
@@ -339,84 +469,384 @@ def request_image(image_url):
     return None
 
 
-def get_roll_image(
-    druid,
-    image_url,
-    roll_type,
-    redownload_image=False,
-    mirror_roll=False,
-    gen2scan=False,
-):
-    """Attempts to download an image of the roll specified by DRUID if a URL is
-    provided, otherwise searches for the roll in the local images/ folder.
-    Applies left-right flipping (mirroring) logic if appropriate, and returns
-    a path to the image file."""
+def download_roll_image(response, image_filepath):
+    """Writes the roll image in the (streamed) response to image_filepath. If
+    the image is large and the server accepts range requests, the image is
+    instead downloaded in several parts over parallel connections, which are
+    written into place in the file as they arrive; the response is only read
+    if the server doesn't honor the range requests or the parallel download
+    fails."""
+
+    image_size = int(response.headers.get("Content-Length", 0))
+    try:
+        if (
+            image_size < PARALLEL_DOWNLOAD_MIN_SIZE
+            or response.headers.get("Accept-Ranges") != "bytes"
+            or "Content-Encoding" in response.headers
+            or not parallel_download(response, image_filepath, image_size)
+        ):
+            with open(image_filepath, "wb") as image_file:
+                copyfileobj(response.raw, image_file, DOWNLOAD_CHUNK_SIZE)
+    finally:
+        response.close()
+
+
+def parallel_download(response, image_filepath, image_size):
+    """Downloads the file requested in the response to image_filepath in
+    PARALLEL_DOWNLOAD_PARTS ranges, fetched concurrently. The range requests
+    are conditional on the file on the server being the same one as in the
+    response. Returns False if any of them fails or isn't answered with the
+    requested range (before anything is written), or if any of the parts
+    can't be downloaded, so that the caller can download the file from the
+    response instead."""
+
+    part_size = -(-image_size // PARALLEL_DOWNLOAD_PARTS)
+    ranges = [
+        (start, min(start + part_size, image_size) - 1)
+        for start in range(0, image_size, part_size)
+    ]
+    validator = response.headers.get("ETag", response.headers.get("Last-Modified"))
+
+    def request_range(byte_range):
+        headers = {"Range": f"bytes={byte_range[0]}-{byte_range[1]}"}
+        if validator is not None:
+            headers["If-Range"] = validator
+        return SESSION.get(response.url, stream=True, headers=headers)
+
+    def write_range(byte_range, part):
+        offset, end = byte_range
+        try:
+            while offset <= end and not download_failed.is_set():
+                chunk = part.raw.read(min(DOWNLOAD_CHUNK_SIZE, end + 1 - offset))
+                if not chunk:
+                    raise IOError(f"Download of {response.url} ended early")
+                os.pwrite(image_file, chunk, offset)
+                offset += len(chunk)
+        except BaseException:
+            # Stops the other parts as well
+            download_failed.set()
+            raise
+        finally:
+            part.close()
+
+    # Leaving each executor's context waits for all of its tasks, so no part
+    # is still open (or being written) once they are checked
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        range_requests = [
+            executor.submit(request_range, byte_range) for byte_range in ranges
+        ]
+    parts = [request.result() for request in range_requests if not request.exception()]
+    try:
+        # Each part must be exactly the range requested, from the same file
+        if len(parts) < len(ranges) or any(
+            part.status_code != 206
+            or part.headers.get("Content-Range") != f"bytes {start}-{end}/{image_size}"
+            for (start, end), part in zip(ranges, parts)
+        ):
+            logging.info(f"Range requests for {response.url} failed or not honored")
+            return False
 
-    image_already_mirrored = False
+        logging.info(f"Downloading {image_filepath} in {len(ranges)} parts")
+        download_failed = threading.Event()
+        image_file = os.open(image_filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        try:
+            os.ftruncate(image_file, image_size)
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                range_writes = [
+                    executor.submit(write_range, byte_range, part)
+                    for byte_range, part in zip(ranges, parts)
+                ]
+        finally:
+            # Only closed once none of the threads can write to it any more
+            os.close(image_file)
+        for range_write in range_writes:
+            if range_write.exception() is not None:
+                logging.error(
+                    f"Parallel download of {response.url} failed ({range_write.exception()}), downloading it in a single stream"
+                )
+                return False
+    finally:
+        for part in parts:
+            part.close()
+    return True
+
+
+def fetch_roll_image(druid, image_url, redownload_image=False, mirror_roll=False):
+    """Makes sure that the source image of the roll specified by DRUID (a TIFF,
+    or a JPEG2000 to be converted to a TIFF by prepare_roll_image()) is in the
+    local images/ folder, downloading it if it is missing or (if
+    redownload_image is set) has changed on the server. A newly downloaded
+    TIFF is mirrored if appropriate before it replaces the cached copy. This
+    is the network-bound part of getting the roll image. Returns the path of
+    the source image, or None if no image is available."""
+
+    images_dir = Path("images")
+    if image_url is None:
+        image_filepath = images_dir / f"{druid}.tiff"
+        if image_filepath.is_file():
+            logging.info(f"Using local roll image {image_filepath}")
+            return image_filepath
+        logging.error(f"No roll image available for {druid}")
+        return None
 
-    target_pathname = Path(f"images/{image_url.split('/')[-1]}")
-    image_filepath = Path(f"images/{druid}.tiff")
+    target_pathname = images_dir / image_url.split("/")[-1]
+    image_filepath = images_dir / f"{druid}.tiff"
+    is_jp2 = target_pathname.suffix == ".jp2"
 
-    # If the source image is a JP2, prepare to convert it to a TIFF
-    if image_url.endswith(".jp2"):
-        source_filepath = Path(f"images/{druid}.jp2")
+    # If the source image is a JP2, it's downloaded to be converted to a TIFF
+    if is_jp2:
+        source_filepath = images_dir / f"{druid}.jp2"
     else:
         source_filepath = target_pathname
 
-    # If the source image is a TIFF and it's stored locally, stop here
-    if (
-        not redownload_image
-        and os.path.isfile(target_pathname)
-        and target_pathname.suffix in (".tiff", ".tif")
+    # If the source image (or the TIFF converted from a JP2) is stored locally
+    # and isn't to be redownloaded, stop here
+    if not redownload_image and (
+        source_filepath.is_file() or (is_jp2 and image_filepath.is_file())
     ):
-        return target_pathname
+        if is_jp2 and source_filepath.is_file():
+            logging.info("JPEG2000 already downloaded")
+        return source_filepath
+
+    # Otherwise, download the image, unless the cached copy is still current
+    response = request_image(image_url, source_filepath)
+    if response is not None and response.status_code == 200:
+        # The TIFF converted from the previous version of a JP2 is out of date
+        if is_jp2:
+            image_filepath.unlink(missing_ok=True)
+        # The image is downloaded to a temporary .part file that only replaces
+        # the cached copy once the download is complete, so a failed download
+        # never leaves a truncated image behind
+        partial_filepath = source_filepath.with_name(f"{source_filepath.name}.part")
+        try:
+            download_roll_image(response, partial_filepath)
+            # Always flip a roll's image on first download if it's known to be
+            # improperly mirrored, or if mirroring is specified on the cmd
+            # line (a JP2 is mirrored when it's converted). Doing this before
+            # the image is cached means that an interrupted run can't leave an
+            # image behind that was never mirrored, and that a cached image is
+            # never flipped back to its initial orientation.
+            if not is_jp2 and (druid in REVERSED_IMAGES or mirror_roll):
+                flip_image_left_right(partial_filepath)
+            partial_filepath.replace(source_filepath)
+        except BaseException:
+            partial_filepath.unlink(missing_ok=True)
+            raise
+        save_cache_validators(source_filepath, response)
+        return source_filepath
+    if source_filepath.is_file() or (is_jp2 and image_filepath.is_file()):
+        return source_filepath
+    return None
 
-    # Otherwise, download the image and convert it to a TIFF if necessary
-    if not os.path.isfile(image_filepath) or redownload_image:
-        if target_pathname.suffix in (".tiff", ".tif"):
-            source_filepath = target_pathname
-            image_filepath = target_pathname
 
-        if image_url.endswith(".jp2") and os.path.isfile(source_filepath):
-            logging.info("JPEG2000 already downloaded")
-        else:
-            response = request_image(image_url)
-            if response is not None:
-                with open(source_filepath, "wb") as image_file:
-                    copyfileobj(response.raw, image_file)
-            del response
-        # High-contrast infrared versions of Gen2 scans are JP2s, must be
-        # converted in place into TIFFs and flipped vertically for parsing
-        if image_url.endswith(".jp2"):
-            logging.info(f"Converting JPEG2000 to TIFF: {source_filepath}")
-            image_array = decode(source_filepath)
-            img = Image.fromarray(image_array)
-            # XXX Need to check all contingencies...
-            if gen2scan or roll_type != "welte-red":
-                logging.info(f"Flipping image top-bttom: {image_filepath}")
-                img = img.transpose(Image.FLIP_TOP_BOTTOM)
-            img.save(image_filepath)
-        # Always flip a roll's image on first download if it's known to be
-        # improperly mirrored
-        if druid in REVERSED_IMAGES:
-            flip_image_left_right(image_filepath)
-            image_already_mirrored = True
-    # Don't re-flip the image after the first download, even if specified on
-    # the cmd line -- this would just flip it back to its initial orientation
-    if mirror_roll and not image_already_mirrored:
-        flip_image_left_right(image_filepath)
+def prepare_roll_image(
+    druid, source_filepath, roll_type, mirror_roll=False, gen2scan=False
+):
+    """Gets the roll image that was fetched by fetch_roll_image() ready for
+    parsing: converts a JPEG2000 source image to a TIFF, if this hasn't been
+    done yet, applying left-right flipping (mirroring) logic if appropriate.
+    This is the CPU-bound part of getting the roll image. Returns a path to
+    the TIFF image file."""
+
+    # A TIFF source image was already mirrored (if needed) when downloaded
+    if source_filepath.suffix != ".jp2":
+        return source_filepath
+
+    # High-contrast infrared versions of Gen2 scans are JP2s, must be
+    # converted in place into TIFFs and flipped vertically for parsing. Any
+    # mirroring is done as part of the conversion rather than by rewriting the
+    # TIFF afterwards. The TIFF is removed when a new version of the JP2 is
+    # downloaded, so it's only converted (and mirrored) once per version.
+    image_filepath = source_filepath.with_suffix(".tiff")
+    if image_filepath.is_file():
+        logging.info(f"{image_filepath} is already converted from {source_filepath}")
+        return image_filepath
+    # As with downloads, an interrupted conversion leaves no partial TIFF
+    partial_filepath = image_filepath.with_name(f"{image_filepath.name}.part")
+    try:
+        # XXX Need to check all contingencies...
+        convert_jp2_to_tiff(
+            source_filepath,
+            partial_filepath,
+            flip_top_bottom=gen2scan or roll_type != "welte-red",
+            flip_left_right=druid in REVERSED_IMAGES or mirror_roll,
+        )
+        partial_filepath.replace(image_filepath)
+    except BaseException:
+        partial_filepath.unlink(missing_ok=True)
+        raise
     return image_filepath
 
 
+def write_roll_tiff(image_filepath, image_array, photometric=None):
+    """Writes the image array to an uncompressed TIFF file, which is the format
+    tiff2holes expects. tifffile switches to BigTIFF automatically if the image
+    is too large for a classic TIFF."""
+
+    tifffile.imwrite(
+        image_filepath, image_array, photometric=photometric, metadata=None
+    )
+
+
+def convert_jp2_to_tiff(
+    source_filepath, image_filepath, flip_top_bottom=False, flip_left_right=False
+):
+    """Decodes a JPEG2000 roll image and writes it to image_filepath as a TIFF
+    that tiff2holes can parse, optionally flipping it vertically and/or
+    horizontally (mirroring). The decoded array is written directly, without an
+    intermediate image object."""
+
+    logging.info(f"Converting JPEG2000 to TIFF: {source_filepath}")
+    image_array = decode(source_filepath)
+    # Roll scans are 8-bit, but make sure the TIFF doesn't end up with wider
+    # samples than that (which tiff2holes would have to read and skip over);
+    # higher-precision images are scaled down to 8 bits
+    if image_array.dtype != np.uint8:
+        shift = max(get_parameters(source_filepath)["precision"] - 8, 0)
+        # Shifted in place, so the 8-bit samples are the only copy made
+        if shift > 0:
+            np.right_shift(image_array, shift, out=image_array)
+        image_array = image_array.astype(np.uint8)
+    # The image is mirrored in place. The vertical flip is a reversed view of
+    # the rows, which tifffile copies into a contiguous array as it writes the
+    # image out.
+    if flip_left_right:
+        logging.info(f"Flipping image left-right: {image_filepath}")
+        mirror_image_array(image_array)
+    if flip_top_bottom:
+        logging.info(f"Flipping image top-bttom: {image_filepath}")
+        image_array = image_array[::-1]
+    write_roll_tiff(
+        image_filepath,
+        image_array,
+        "minisblack" if image_array.ndim == 2 else "rgb",
+    )
+
+
+def mirror_image_array(image_array):
+    """Flips an image array (which may be a memory map of a TIFF file)
+    left-right in place, in blocks of rows of about FLIP_BLOCK_SIZE bytes, so
+    that only one block is copied at a time."""
+
+    rows_per_block = max(1, FLIP_BLOCK_SIZE // image_array[0].nbytes)
+    for start in range(0, image_array.shape[0], rows_per_block):
+        block = image_array[start : start + rows_per_block]
+        block[:] = block[:, ::-1]
+
+
 def flip_image_left_right(image_filepath):
     """Sometimes a downloaded roll image needs to be flipped left-right
     (mirrored), for reasons described elsewhere in this documentation.
     Performs this mirroring in place."""
 
     logging.info(f"Flipping image left-right: {image_filepath}")
-    img = Image.open(image_filepath)
-    out = img.transpose(Image.FLIP_LEFT_RIGHT)
-    out.save(image_filepath)
+    try:
+        image_array = tifffile.memmap(image_filepath, mode="r+")
+    except ValueError:
+        # The image data are compressed or not stored contiguously
+        image_array = None
+    if image_array is not None:
+        mirror_image_array(image_array)
+        image_array.flush()
+        return
+
+    with tifffile.TiffFile(image_filepath) as tiff:
+        page = tiff.pages[0]
+        if (
+            page.bitspersample == 1
+            and page.samplesperpixel == 1
+            and page.compression == tifffile.COMPRESSION.NONE
+            and page.fillorder == 1
+            and not page.is_tiled
+        ):
+            strips = list(zip(page.dataoffsets, page.databytecounts))
+            image_width = page.imagewidth
+            image_array = None
+        else:
+            photometric = page.photometric
+            image_array = page.asarray()
+    if image_array is None:
+        flip_bilevel_image_left_right(image_filepath, image_width, strips)
+        return
+
+    # The decoded image is mirrored in place, so it is the only copy of the
+    # image in memory while it is being written back out (uncompressed)
+    mirror_image_array(image_array)
+    write_roll_tiff(image_filepath, image_array, photometric)
+
+
+def flip_bilevel_image_left_right(image_filepath, image_width, strips):
+    """Mirrors an uncompressed 1-bit (bilevel) TIFF image in place, strip by
+    strip, by reversing the order of the bits in each row of the packed image
+    data. The strips are given as (offset, byte count) pairs."""
+
+    row_bytes = (image_width + 7) // 8
+    rows_per_block = max(1, FLIP_BLOCK_SIZE // (8 * row_bytes))
+    file_data = np.memmap(image_filepath, dtype=np.uint8, mode="r+")
+    for offset, bytecount in strips:
+        strip_rows = bytecount // row_bytes
+        strip = file_data[offset : offset + strip_rows * row_bytes].reshape(
+            strip_rows, row_bytes
+        )
+        for start in range(0, strip_rows, rows_per_block):
+            block = strip[start : start + rows_per_block]
+            if image_width % 8 == 0:
+                block[:] = BIT_REVERSED_BYTES[block[:, ::-1]]
+            else:
+                # The padding bits at the end of each row must stay at the end
+                bits = np.unpackbits(block, axis=1, count=image_width)
+                block[:] = np.packbits(bits[:, ::-1], axis=1)
+    file_data.flush()
+
+
+def tee_midi_sections(chunks, analysis_file):
+    """Writes the chunks of tiff2holes analysis output to analysis_file as
+    they arrive, keeping only the lines of the binasc-encoded MIDI sections
+    (see ANALYSIS_MIDI_SECTIONS) so that the rest of the report isn't held in
+    memory. Returns the same dictionary as find_midi_sections() would for the
+    whole report."""
+
+    headers = {
+        header.encode(): midi_type
+        for header, midi_type in ANALYSIS_MIDI_SECTIONS.items()
+    }
+    midi_lines = {}
+    section = None
+
+    def scan(lines):
+        nonlocal section
+        for line in lines:
+            if section is None and not line.startswith(b"@"):
+                continue
+            # Line endings are normalized as in find_midi_sections()
+            text = line.rstrip(b"\r\n")
+            newline = b"\n" if len(text) < len(line) else b""
+            if not text.startswith(b"@"):
+                section.append(text + newline)
+                continue
+            # A section runs until the next header line, and the newline
+            # before it doesn't belong to the section
+            if section is not None:
+                section[-1] = section[-1][:-1]
+            midi_type = headers.get(text)
+            if midi_type is None or midi_type in midi_lines:
+                section = None
+            else:
+                section = midi_lines[midi_type] = [newline]
+
+    # A line is only scanned once its line ending (which may be a CRLF split
+    # across two chunks) has arrived
+    pending = b""
+    for chunk in chunks:
+        analysis_file.write(chunk)
+        lines = (pending + chunk).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(b"\n") else b""
+        scan(lines)
+    scan(pending.splitlines(keepends=True))
+
+    return {
+        midi_type: b"".join(lines).decode() for midi_type, lines in midi_lines.items()
+    }
 
 
 def parse_roll_image(
@@ -430,73 +860,127 @@ def parse_roll_image(
 ):
     """Runs the external tiff2holes roll image parsing tool on roll image for
     the DRUID specified in the parameters, adding the appropriate command-line
-    switches and parameters to the command."""
+    switches and parameters to the command. The analysis output is written to
+    txt/DRUID.txt as it is produced, and its MIDI sections are returned (see
+    tee_midi_sections()) so that the file doesn't need to be read back. If the
+    parser fails, its partial output is removed and None is returned."""
 
-    if not Path(tiff2holes).exists():
-        logging.error(f"tiff2holes executable not found at {tiff2holes}")
-        return
     if image_filepath is None or roll_type == "NA":
         logging.info(f"No image at {image_filepath} or roll type unknown")
-        return
+        return None
 
-    t2h_switches = ""
+    t2h_args = [tiff2holes]
 
     # Gen2 scans _should_ all be multi-channel
     if is_monochrome and not gen2scan:
-        t2h_switches = "-m "
+        t2h_args.append("-m")
 
     if roll_type == "welte-red":
-        t2h_switches += "-r"
+        t2h_args.append("-r")
     elif roll_type == "88-note":
-        t2h_switches += "-8"
+        t2h_args.append("-8")
     elif roll_type == "65-note":
-        t2h_switches += "-5"
+        t2h_args.append("-5")
     elif roll_type == "welte-green":
-        t2h_switches += "-g"
+        t2h_args.append("-g")
     elif roll_type == "welte-licensee":
-        t2h_switches += "-l"
+        t2h_args.append("-l")
     elif roll_type == "duo-art":
-        t2h_switches += "-d"
+        t2h_args.append("-d")
 
     if ignore_rewind_hole:
-        t2h_switches += " -s"
+        t2h_args.append("-s")
 
     if druid in MANUAL_ALIGNMENT_CORRECTIONS:
-        t2h_switches += f" --alignment-shift={MANUAL_ALIGNMENT_CORRECTIONS[druid]}"
+        t2h_args.append(f"--alignment-shift={MANUAL_ALIGNMENT_CORRECTIONS[druid]}")
+
+    t2h_args.append(str(image_filepath))
 
-    cmd = f"{tiff2holes} {t2h_switches} {image_filepath} > txt/{druid}.txt 2> logs/{druid}.err"
     logging.info(f"Running image parser on {image_filepath} (roll type {roll_type})")
-    os.system(cmd)
+    analysis_filepath = Path(f"txt/{druid}.txt")
+    with analysis_filepath.open("wb") as analysis_file, open(
+        f"logs/{druid}.err", "wb"
+    ) as err_file, subprocess.Popen(
+        t2h_args, stdout=subprocess.PIPE, stderr=err_file
+    ) as process:
+        midi_data = tee_midi_sections(iter(process.stdout.read1, b""), analysis_file)
+    if process.returncode != 0:
+        logging.error(
+            f"tiff2holes failed on {image_filepath} (exit status {process.returncode}), see logs/{druid}.err"
+        )
+        # A partial report would keep the image from being parsed again
+        analysis_filepath.unlink()
+        return None
+    return midi_data
 
 
-def convert_binasc_to_midi(binasc_data, druid, midi_type, binasc):
+def convert_binasc_to_midi(binasc_data, druid, midi_type, binasc, keep_binasc=False):
     """Invokes the external binasc tool to convert the provided ASCII-encoded
-    hexadecimal representation of a MIDI file to binary MIDI format. This
-    involves first writing the input data to a separate .binasc file and then
-    running the binasc tool on it to generate a .mid file."""
-
-    if not Path(binasc).exists():
-        logging.error(f"binasc executable not found at {binasc}")
-        return
-    binasc_file_path = f"binasc/{druid}_{midi_type}.binasc"
-    with open(binasc_file_path, "w") as binasc_file:
-        binasc_file.write(binasc_data)
-    if Path(binasc).exists():
-        cmd = f"{binasc} {binasc_file_path} -c midi/{midi_type}/{druid}_{midi_type}.mid"
-        os.system(cmd)
+    hexadecimal representation of a MIDI file to binary MIDI format. The input
+    data is piped to binasc's standard input; it is also written to a separate
+    .binasc file if keep_binasc is set."""
+
+    if keep_binasc:
+        Path(f"binasc/{druid}_{midi_type}.binasc").write_text(binasc_data)
+    result = subprocess.run(
+        [binasc, "-c", f"midi/{midi_type}/{druid}_{midi_type}.mid"],
+        input=binasc_data.encode(),
+    )
+    if result.returncode != 0:
+        logging.error(
+            f"binasc failed to convert {midi_type} MIDI for {druid} (exit status {result.returncode})"
+        )
 
 
-def extract_midi_from_analysis(druid, regenerate_midi, binasc):
+def find_midi_sections(contents):
+    """Locates the binasc-encoded MIDI sections (see ANALYSIS_MIDI_SECTIONS)
+    in the contents (bytes or a memory map) of a tiff2holes analysis report.
+    Section boundaries are found with byte searches rather than by examining
+    each line in Python. Returns a dictionary mapping the MIDI type ("raw" or
+    "note") to the section's text, for each section found."""
+
+    # The report used to be read in text mode, which turned CRLF (or CR) line
+    # endings into newlines, so such a report is normalized the same way
+    if contents.find(b"\r") >= 0:
+        contents = bytes(contents).replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+    midi_data = {}
+    for header, midi_type in ANALYSIS_MIDI_SECTIONS.items():
+        header = header.encode()
+        # The header must be a line of its own
+        if contents[: len(header) + 1] in (header, header + b"\n"):
+            start = len(header)
+        else:
+            start = contents.find(b"\n" + header + b"\n")
+            if start < 0:
+                if contents[-len(header) - 1 :] != b"\n" + header:
+                    continue
+                start = len(contents) - len(header) - 1
+            start += len(header) + 1
+        # The section runs until the next header line (the newline before it
+        # doesn't belong to the section) or the end of the file
+        end = contents.find(b"\n@", start)
+        if end < 0:
+            end = len(contents)
+        midi_data[midi_type] = contents[start:end].decode()
+    return midi_data
+
+
+def extract_midi_from_analysis(
+    druid, regenerate_midi, binasc, keep_binasc=False, midi_data=None
+):
     """Extracts the ASCII-encoded hexadecmial representations of a roll's raw
     and note MIDI realization from the .txt output data file produced via
-    the tiff2holes roll image parsing tool (see parse_roll_image()). Via
+    the tiff2holes roll image parsing tool (see parse_roll_image()), unless
+    the MIDI sections of the output (midi_data) are already provided. Via
     convert_binasc_to_midi(), these realizations are written to local files as
     DRUID_note.mid and DRUID_raw.mid if they are not already present or the
     regenerate_midi parameter is true."""
 
-    if not Path(f"txt/{druid}.txt").exists():
+    analysis_filepath = Path(f"txt/{druid}.txt")
+    if midi_data is None and not analysis_filepath.exists():
         logging.error(
-            f"Hole analysis report does not exist at txt/{druid}.txt, cannot extract MIDI"
+            f"Hole analysis report does not exist at {analysis_filepath}, cannot extract MIDI"
         )
         return
     if not regenerate_midi and Path(f"midi/note/{druid}_note.mid").exists():
@@ -505,23 +989,36 @@ def extract_midi_from_analysis(druid, regenerate_midi, binasc):
         )
         return
 
-    logging.info(f"Extracting MIDI from txt/{druid}.txt")
-    with open(f"txt/{druid}.txt", "r") as analysis:
-        contents = analysis.read()
-        # NOTE: the binasc utility *requires* a trailing blank line at the end
-        # of the text input
-        holes_data = (
-            re.search(r"^@HOLE_MIDIFILE:$(.*)", contents, re.M | re.S)
-            .group(1)
-            .split("\n@")[0]
-        )
-        convert_binasc_to_midi(holes_data, druid, "raw", binasc)
-        notes_data = (
-            re.search(r"^@MIDIFILE:$(.*)", contents, re.M | re.S)
-            .group(1)
-            .split("\n@")[0]
+    logging.info(f"Extracting MIDI from {analysis_filepath}")
+    if midi_data is None:
+        # An empty file can't be memory-mapped
+        if analysis_filepath.stat().st_size == 0:
+            logging.error(f"Hole analysis report {analysis_filepath} is empty")
+            return
+        with analysis_filepath.open("rb") as analysis_file, mmap.mmap(
+            analysis_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as contents:
+            # Only the MIDI sections are copied out of the memory-mapped file
+            midi_data = find_midi_sections(contents)
+    if len(midi_data) < len(ANALYSIS_MIDI_SECTIONS):
+        logging.error(f"Unable to find MIDI data in {analysis_filepath}")
+        return
+    # NOTE: the binasc utility *requires* a trailing blank line at the end of
+    # the text input
+    holes_data = midi_data["raw"]
+    notes_data = midi_data["note"]
+    # The raw and note conversions are independent, and the threads just wait
+    # on the binasc processes, so the two can run at the same time
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(
+            executor.map(
+                lambda binasc_data, midi_type: convert_binasc_to_midi(
+                    binasc_data, druid, midi_type, binasc, keep_binasc
+                ),
+                (holes_data, notes_data),
+                ("raw", "note"),
+            )
         )
-        convert_binasc_to_midi(notes_data, druid, "note", binasc)
 
 
 def apply_midi_expressions(druid, roll_type, midi2exp):
@@ -529,9 +1026,6 @@ def apply_midi_expressions(druid, roll_type, midi2exp):
     the note MIDI realization of a roll image, adding the appropriate
     command-line parameters to the command to run the tool."""
 
-    if not Path(midi2exp).exists():
-        logging.error(f"midi2exp executable not found at {midi2exp}")
-        return
     if not Path(f"midi/note/{druid}_note.mid").exists():
         logging.error(
             f"Note MIDI file does not exist at midi/note/{druid}_note.mid, cannot apply expressions"
@@ -541,31 +1035,163 @@ def apply_midi_expressions(druid, roll_type, midi2exp):
         return
 
     # The -r switch removes the control tracks (3-4, 0-indexed)
-    m2e_switches = (
-        "-r -adjust-hole-lengths"  # add --ac 0 for no acceleration, when available
-    )
+    m2e_args = [
+        midi2exp,
+        "-r",
+        "-adjust-hole-lengths",  # add --ac 0 for no acceleration, when available
+    ]
     if roll_type == "welte-red":
-        m2e_switches += " -w"
+        m2e_args.append("-w")
     elif roll_type == "welte-green":
-        m2e_switches += " -g"
+        m2e_args.append("-g")
     elif roll_type == "welte-licensee":
-        m2e_switches += " -l"
+        m2e_args.append("-l")
     elif roll_type == "88-note":
-        m2e_switches += " -h"
+        m2e_args.append("-h")
     elif roll_type == "duo-art":
-        m2e_switches += " -u"
-    cmd = (
-        f"{midi2exp} {m2e_switches} midi/note/{druid}_note.mid midi/exp/{druid}_exp.mid"
-    )
+        m2e_args.append("-u")
+    m2e_args += [f"midi/note/{druid}_note.mid", f"midi/exp/{druid}_exp.mid"]
     logging.info(f"Running expression extraction on midi/note/{druid}_note.mid")
-    os.system(cmd)
+    result = subprocess.run(m2e_args)
+    if result.returncode != 0:
+        logging.error(
+            f"midi2exp failed on midi/note/{druid}_note.mid (exit status {result.returncode})"
+        )
+        return False
     return True
 
 
+def roll_image_needed(druid, args):
+    """Returns True if the image of the roll specified by DRUID is needed (or
+    is to be redownloaded), i.e. unless the image has already been parsed
+    and only the MIDI files are to be (re)generated."""
+
+    return (
+        args.reprocess_images
+        or args.redownload_images
+        or not Path(f"txt/{druid}.txt").exists()
+    )
+
+
+def prefetch_metadata(druids, args):
+    """Downloads the IIIF manifests and XML metadata files for all of the
+    DRUIDs specified, using a pool of threads so that the requests for
+    different rolls overlap. Manifests are only needed for rolls whose images
+    haven't been parsed yet (or are to be reprocessed or redownloaded); cached
+    manifests of these rolls are always revalidated with the server (an
+    unchanged manifest costs only a 304 response). XML files are
+    only downloaded if they are missing or to be redownloaded. The files
+    aren't parsed here; later lookups for these rolls read them from the local
+    manifests/ and xml/ folders."""
+
+    def prefetch_xml(druid):
+        try:
+            download_xml(druid)
+        except requests.RequestException:
+            logging.error(f"Unable to download XML metadata for {druid}")
+
+    downloads = []
+    for druid in druids:
+        if druid in ROLLS_TO_SKIP:
+            continue
+        # The manifest is only needed to find the roll image
+        if roll_image_needed(druid, args):
+            downloads.append(partial(download_iiif_manifest, druid))
+        if args.roll_type == "NA" and (
+            args.redownload_metadata or not Path(f"xml/{druid}.xml").exists()
+        ):
+            downloads.append(partial(prefetch_xml, druid))
+    if not downloads:
+        return
+
+    logging.info("Downloading (or revalidating) IIIF manifests and XML metadata...")
+    with ThreadPoolExecutor(max_workers=PREFETCH_THREADS) as executor:
+        list(executor.map(lambda download: download(), downloads))
+
+
+def download_roll(druid, args):
+    """Downloads the roll image for the roll specified by DRUID if needed (see
+    fetch_roll_image()). This is the network-bound stage of the pipeline, run
+    in threads of the main process; everything else is left to
+    process_roll(). Returns what fetch_roll_image() returns, or None if the
+    image isn't needed."""
+
+    if not roll_image_needed(druid, args):
+        logging.info(
+            f"Image analysis for {druid} already exists and reprocess not specified, skipping image download"
+        )
+        return None
+
+    logging.info(f"Downloading {druid}...")
+
+    # The manifest was revalidated when the batch's metadata was prefetched
+    iiif_manifest = get_iiif_manifest(druid)
+
+    return fetch_roll_image(
+        druid,
+        get_image_url(iiif_manifest),
+        args.redownload_images,
+        args.mirror_images,
+    )
+
+
+def process_roll(druid, roll_image, args):
+    """Runs the image preparation, image parsing and MIDI generation stages of
+    the pipeline for the roll specified by DRUID, according to the
+    command-line arguments. roll_image is the result of download_roll()."""
+
+    logging.info(f"Processing {druid}...")
+
+    if args.roll_type != "NA":
+        roll_type = args.roll_type
+    else:
+        roll_type = get_roll_type_for_druid(druid, args.redownload_metadata)
+        logging.info(f"Roll type for {druid} is {roll_type}")
+
+    if roll_image is not None:
+        roll_image = prepare_roll_image(
+            druid, roll_image, roll_type, args.mirror_images, args.gen2scan
+        )
+
+    # If the image is parsed now, the MIDI data are extracted from the output
+    # as it is produced rather than from the copy written to txt/
+    midi_data = None
+    if args.reprocess_images or (
+        not Path(f"txt/{druid}.txt").exists() and roll_image is not None
+    ):
+        midi_data = parse_roll_image(
+            druid,
+            roll_image,
+            roll_type,
+            args.ignore_rewind_hole or (druid in IGNORE_REWIND_HOLE),
+            args.tiff2holes,
+            not args.multichannel_tiffs,
+            args.gen2scan,
+        )
+
+    extract_midi_from_analysis(
+        druid, args.regenerate_midi, args.binasc, args.keep_binasc, midi_data
+    )
+
+    if not args.no_expression:
+        apply_midi_expressions(druid, roll_type, args.midi2exp)
+
+
+def positive_int(value):
+    """Converts a command-line argument to an integer of at least 1, such as
+    a number of parallel jobs; argparse reports any other value as an
+    error."""
+
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
 def main():
     """Command-line entry-point."""
 
-    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    init_worker()
 
     argparser = argparse.ArgumentParser(
         description="Download and process roll image(s) to produce MIDI files"
@@ -600,17 +1226,22 @@ def main():
     argparser.add_argument(
         "--redownload-manifests",
         action="store_true",
-        help="Always download IIIF manifests, overwriting files in manifests/",
+        help="No longer needed: cached IIIF manifests are always revalidated with the server, and downloaded again if changed",
     )
     argparser.add_argument(
         "--redownload-metadata",
         action="store_true",
-        help="Always download XML metadata files, overwriting files in xml/",
+        help="Download XML metadata files again if changed on the server, overwriting files in xml/",
     )
     argparser.add_argument(
         "--redownload-images",
         action="store_true",
-        help="Always download roll images, overwriting files in images/",
+        help="Download roll images again if changed on the server, overwriting files in images/",
+    )
+    argparser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help="Check all cached XML metadata files and roll images with the server, downloading any that have changed (same as all --redownload-* options)",
     )
     argparser.add_argument(
         "--reprocess-images",
@@ -632,6 +1263,11 @@ def main():
         action="store_true",
         help="Always generate new _raw.mid and _note.mid MIDI files, overwriting existing versions",
     )
+    argparser.add_argument(
+        "--keep-binasc",
+        action="store_true",
+        help="Also write the extracted binasc MIDI data to files in binasc/",
+    )
     argparser.add_argument(
         "--no-expression",
         action="store_true",
@@ -652,6 +1288,13 @@ def main():
         default=MIDI2EXP,
         help="Location of a compiled midi2exp binary",
     )
+    argparser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of rolls to process in parallel",
+    )
     argparser.add_argument(
         "--gen2scan",
         action="store_true",
@@ -660,6 +1303,10 @@ def main():
 
     args = argparser.parse_args()
 
+    if args.revalidate:
+        args.redownload_metadata = True
+        args.redownload_images = True
+
     # Adding DRUIDs here will override user input
     druids = []
 
@@ -670,47 +1317,68 @@ def main():
     elif args.druids_txt_file is not None:
         druids = get_druids_from_txt_file(args.druids_txt_file)
 
-    for druid in druids:
-        if druid in ROLLS_TO_SKIP:
-            logging.info(f"Skippig DRUID {druid}")
-            continue
-
-        logging.info(f"Downloading and processing {druid}...")
-
-        iiif_manifest = get_iiif_manifest(druid, args.redownload_manifests)
-
-        if args.roll_type != "NA":
-            roll_type = args.roll_type
-        else:
-            roll_type = get_roll_type_for_druid(druid, args.redownload_metadata)
-            logging.info(f"Roll type for {druid} is {roll_type}")
-
-        roll_image = get_roll_image(
-            druid,
-            get_image_url(iiif_manifest),
-            roll_type,
-            args.redownload_images,
-            args.mirror_images,
-            args.gen2scan,
-        )
-
-        if args.reprocess_images or (
-            not Path(f"txt/{druid}.txt").exists() and roll_image is not None
-        ):
-            parse_roll_image(
-                druid,
-                roll_image,
-                roll_type,
-                args.ignore_rewind_hole or (druid in IGNORE_REWIND_HOLE),
-                args.tiff2holes,
-                not args.multichannel_tiffs,
-                args.gen2scan,
-            )
-
-        extract_midi_from_analysis(druid, args.regenerate_midi, args.binasc)
-
-        if not args.no_expression:
-            apply_midi_expressions(druid, roll_type, args.midi2exp)
+    # Check for the external tools once, rather than failing on every roll;
+    # tiff2holes is only needed if there are roll images to be parsed
+    tools = {"binasc": args.binasc}
+    if any(
+        args.reprocess_images or not Path(f"txt/{druid}.txt").exists()
+        for druid in druids
+        if druid not in ROLLS_TO_SKIP
+    ):
+        tools["tiff2holes"] = args.tiff2holes
+    if not args.no_expression:
+        tools["midi2exp"] = args.midi2exp
+    for tool_name, tool in tools.items():
+        if not (Path(tool).is_file() and os.access(tool, os.X_OK)):
+            argparser.error(f"{tool_name} executable not found at {tool}")
+
+    # All of the network round trips for the (small) metadata files are done
+    # up front, so the per-roll processing doesn't need to download them again
+    prefetch_metadata(druids, args)
+    args.redownload_metadata = False
+
+    # The rolls go through a two-stage pipeline: roll images are downloaded by
+    # a few threads, and each roll is handed to the process pool for image
+    # conversion, parsing and MIDI generation as soon as its image is ready,
+    # so the downloads of later rolls overlap the processing of earlier ones.
+    # Apart from the mirroring of newly downloaded TIFFs, only the HTTP
+    # transfers are done in the main process. Each roll's files are written to
+    # distinct per-DRUID paths, so rolls can be processed in parallel without
+    # conflicts.
+    with ThreadPoolExecutor(
+        max_workers=IMAGE_DOWNLOAD_THREADS
+    ) as downloader, ProcessPoolExecutor(
+        max_workers=args.jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    ) as executor:
+        downloads = {}
+        for druid in druids:
+            if druid in ROLLS_TO_SKIP:
+                logging.info(f"Skippig DRUID {druid}")
+                continue
+            downloads[downloader.submit(download_roll, druid, args)] = druid
+        # An error while processing one roll shouldn't abort the whole batch
+        failed_druids = []
+        futures = {}
+        for download in as_completed(downloads):
+            druid = downloads[download]
+            try:
+                roll_image = download.result()
+            except Exception:
+                logging.exception(f"Unable to download {druid}")
+                failed_druids.append(druid)
+                continue
+            futures[executor.submit(process_roll, druid, roll_image, args)] = druid
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception:
+                logging.exception(f"Unable to process {futures[future]}")
+                failed_druids.append(futures[future])
+
+    if failed_druids:
+        logging.error(f"Processing failed for DRUID(s) {' '.join(failed_druids)}")
 
 
 if __name__ == "__main__":
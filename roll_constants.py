@@ -0,0 +1,109 @@
+"""
+Roll types and per-roll (DRUID) special cases used by process-roll-images.py.
+These are kept in their own module so that the curated lists can be edited
+(and reviewed) separately from the processing code.
+"""
+
+# As new types are added to the collection, their shorthands must be added here
+ROLL_TYPES = [
+    "welte-red",
+    "88-note",
+    "65-note",
+    "welte-green",
+    "welte-licensee",
+    "duo-art",
+]
+
+# Keys are MODS note values with any trailing periods (which are cataloged
+# inconsistently) removed; see normalize_note_text() in process-roll-images.py
+ROLL_TYPE_ENTRIES = {
+    "Welte-Mignon red roll (T-100)": "welte-red",
+    "Scale: 88n": "88-note",
+    "Scale: 65n": "65-note",
+    "88n": "88-note",
+    "65n": "65-note",
+    "standard": "88-note",
+    "non-reproducing": "88-note",
+    "Welte-Mignon green roll (T-98)": "welte-green",
+    "Welte-Mignon licensee roll": "welte-licensee",
+    "Welte-Mignon licensee roll (T-98)": "welte-licensee",
+    "Duo-Art piano rolls": "duo-art",
+}
+
+# The downloadable full-resolution monochome TIFF images of several rolls were
+# erroneously mirrored left-right (so that the bass perforations are on the
+# right side of the image). There may be others like this...
+REVERSED_IMAGES = frozenset(
+    [
+        "yt837kd6607",
+        "ws749sk4778",
+        "hs635sh6729",
+        "zw485gh6070",
+        "xr682fm1233",
+        "mx460bt7026",
+        "cs175wr2428",
+        "bz327kz4744",
+        "wv912mm2332",
+        "jw822wm2644",
+        "fv104hn7521",
+        "fy803vj4057",
+        "kz379jn2491",
+    ]
+)
+
+# This overrides the --ignore_rewind_hole command line switch; both are used
+# to ignore the detected rewind hole position for a roll when assigning MIDI
+# numbers to hole columns (tracker bar positions); the rewind hole position
+# can be detected incorrectly due to test patterns at the end of the roll,
+# conjoined rolls, or spurious holes, and sometimes it's better to ignore it
+# and hope the other alignment methods will assign the MIDI numbers correctly.
+IGNORE_REWIND_HOLE = frozenset(
+    [
+        "mh156nr8259",
+        "cd381jt9273",
+        "qw257qp8232",
+        "tg593zw7367",
+        "cf814vt1322",
+        "ct641rb1417",
+        "cm852bp8620",
+        "cs175wr2428",
+        "ft113cg5195",
+        "pk349zj4179",
+        "pf050rx0162",
+        "rd899zb5188",
+        "ty382mw3181",
+        "hj286gj0705",
+        "sh954gz9635",
+        "wb477ky1555",
+        "tj759sv4290",
+        "xk327pf9243",
+        "pz737tz3677",
+        "yj176wj3359",
+        "pp228yz4317",
+    ]
+)
+
+# This can be used in a last-ditch attempt to strongarm a roll's tracker
+# alignment after all of the other methods has been run. Negative values
+# shift the tracker assignments left, positives to the right.
+MANUAL_ALIGNMENT_CORRECTIONS = {}
+
+# These are either duplicates of existing rolls, or rolls that are listed in
+# DRUIDs files but have disappeared from the catalog, or rolls that were
+# accessioned incorrectly (hm136vg1420)
+# Note: All Duo-Art rolls are currently unusable because their primary images
+# are upside-down on the server.
+ROLLS_TO_SKIP = frozenset(
+    [
+        "rr052wh1991",  # Duplicate of gn803sk7089
+        "hm136vg1420",  # Incorrectly mirrored, but replaced by rg676ym0376 - should be de-accessioned
+        "df354sy6634",  # Needs to be flipped vertically
+        "xc735nd8093",  # Needs to be flipped vertically
+        "sh954gz9635",  # Large section of white paper from repair makes it unparsable
+        "wb477ky1555",  # Green W incorrectly cataloged as Red
+        "pz737tz3677",  # Licensee incorrectly cataloged as Green
+        "yj176wj3359",  # Licensee incorrectly cataloged as Green
+        "sm367hr9769",  # Image(s) seem to be corrupted
+        "sj617nc3041",  # All images erroneously mirrored left-right
+    ]
+)
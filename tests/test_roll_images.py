@@ -0,0 +1,625 @@
+"""
+Regression tests for the download, flipping and MIDI extraction logic of
+process-roll-images.py, run against a mocked HTTP session (no network access or
+external tools are needed). Run with `python -m unittest discover -s tests` from the repository
+folder.
+"""
+
+import argparse
+import importlib.util
+from io import BytesIO
+import os
+from pathlib import Path
+import re
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import tifffile
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+spec = importlib.util.spec_from_file_location(
+    "process_roll_images", REPO_DIR / "process-roll-images.py"
+)
+process_roll_images = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(process_roll_images)
+
+DRUID = "aa111aa1111"
+IMAGE_URL = f"https://stacks.stanford.edu/file/{DRUID}/{DRUID}_gr.tiff"
+
+
+def make_response(status_code, content=b""):
+    """Returns a mock of a streamed requests response."""
+
+    response = mock.Mock()
+    response.status_code = status_code
+    response.url = IMAGE_URL
+    response.raw = BytesIO(content)
+    response.headers = {"Content-Length": str(len(content)), "ETag": '"abc"'}
+    return response
+
+
+def get_roll_image(
+    druid, image_url, roll_type, redownload_image=False, mirror_roll=False
+):
+    """Runs both stages of getting a roll image, as process-roll-images.py does
+    (in different processes)."""
+
+    source_filepath = process_roll_images.fetch_roll_image(
+        druid, image_url, redownload_image, mirror_roll
+    )
+    return process_roll_images.prepare_roll_image(
+        druid, source_filepath, roll_type, mirror_roll
+    )
+
+
+class GetRollImageTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        Path("images").mkdir()
+        self.image = np.arange(6 * 10, dtype=np.uint8).reshape(6, 10)
+        image_data = BytesIO()
+        tifffile.imwrite(image_data, self.image, metadata=None)
+        self.image_data = image_data.getvalue()
+        self.session = mock.Mock()
+        process_roll_images.SESSION = self.session
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def test_unchanged_redownload_is_not_mirrored_again(self):
+        """An image that the server reports as unchanged (304) has already
+        been mirrored when it was first downloaded, so repeated runs with
+        --redownload-images --mirror-images must leave it as it is."""
+
+        responses = [make_response(200, self.image_data)] + [
+            make_response(304) for _ in range(3)
+        ]
+        for response in responses:
+            self.session.get.return_value = response
+            image_filepath = get_roll_image(
+                DRUID, IMAGE_URL, "welte-red", redownload_image=True, mirror_roll=True
+            )
+            np.testing.assert_array_equal(
+                tifffile.imread(image_filepath), self.image[:, ::-1]
+            )
+
+    def test_failed_download_leaves_no_partial_image(self):
+        """A download that fails part-way mustn't leave a truncated image in
+        images/ that a later run would take for a cached copy."""
+
+        response = make_response(200, self.image_data)
+        response.raw = mock.Mock()
+        response.raw.read.side_effect = [self.image_data[:100], IOError("reset")]
+        self.session.get.return_value = response
+        with self.assertRaises(IOError):
+            get_roll_image(DRUID, IMAGE_URL, "welte-red")
+        self.assertEqual(list(Path("images").iterdir()), [])
+
+    def test_images_without_validators_are_not_revalidated_by_mtime(self):
+        """An image without a .meta sidecar may be incomplete, so
+        --redownload-images must fetch it again unconditionally."""
+
+        Path(f"images/{DRUID}_gr.tiff").write_bytes(self.image_data[:100])
+        self.session.get.return_value = make_response(200, self.image_data)
+        image_filepath = get_roll_image(
+            DRUID, IMAGE_URL, "welte-red", redownload_image=True
+        )
+        self.assertNotIn("If-Modified-Since", self.session.get.call_args[1]["headers"])
+        np.testing.assert_array_equal(tifffile.imread(image_filepath), self.image)
+
+    def test_unchanged_jp2_is_not_converted_again(self):
+        """With --redownload-images, a cached JPEG2000 image is revalidated
+        with the server, and isn't converted to a TIFF again if it hasn't
+        changed."""
+
+        jp2_url = f"https://stacks.stanford.edu/file/{DRUID}/{DRUID}_ir_sp.jp2"
+        Path(f"images/{DRUID}.jp2").write_bytes(b"jp2")
+        Path(f"images/{DRUID}.jp2.meta").write_text('{"etag": "\\"abc\\""}')
+        Path(f"images/{DRUID}.tiff").write_bytes(self.image_data)
+        self.session.get.return_value = make_response(304)
+        with mock.patch.object(process_roll_images, "convert_jp2_to_tiff") as convert:
+            image_filepath = get_roll_image(
+                DRUID, jp2_url, "welte-red", redownload_image=True, mirror_roll=True
+            )
+        self.session.get.assert_called_once()
+        self.assertEqual(
+            self.session.get.call_args[1]["headers"]["If-None-Match"], '"abc"'
+        )
+        convert.assert_not_called()
+        np.testing.assert_array_equal(tifffile.imread(image_filepath), self.image)
+
+    def test_new_image_is_mirrored_as_it_is_downloaded(self):
+        """A newly downloaded image that needs mirroring is mirrored before it
+        is cached, so an interrupted run can't leave it unmirrored, and later
+        runs leave it as it is."""
+
+        self.session.get.return_value = make_response(200, self.image_data)
+        image_filepath = process_roll_images.fetch_roll_image(
+            DRUID, IMAGE_URL, mirror_roll=True
+        )
+        np.testing.assert_array_equal(
+            tifffile.imread(image_filepath), self.image[:, ::-1]
+        )
+        image_filepath = get_roll_image(DRUID, IMAGE_URL, "welte-red", mirror_roll=True)
+        self.session.get.assert_called_once()
+        np.testing.assert_array_equal(
+            tifffile.imread(image_filepath), self.image[:, ::-1]
+        )
+
+    def test_jp2_is_converted_in_the_processing_stage(self):
+        """Downloading a JPEG2000 image (in the main process) doesn't convert
+        it; that is left to prepare_roll_image() (in a worker process). A new
+        version of the JP2 replaces the TIFF converted from the old one."""
+
+        jp2_url = f"https://stacks.stanford.edu/file/{DRUID}/{DRUID}_ir_sp.jp2"
+        Path(f"images/{DRUID}.jp2").write_bytes(b"old jp2")
+        Path(f"images/{DRUID}.tiff").write_bytes(b"old tiff")
+        self.session.get.return_value = make_response(200, b"jp2")
+        with mock.patch.object(process_roll_images, "convert_jp2_to_tiff") as convert:
+            convert.side_effect = lambda source_filepath, image_filepath, **kwargs: (
+                image_filepath.write_bytes(self.image_data)
+            )
+            source_filepath = process_roll_images.fetch_roll_image(
+                DRUID, jp2_url, redownload_image=True
+            )
+            convert.assert_not_called()
+            self.assertFalse(Path(f"images/{DRUID}.tiff").exists())
+            image_filepath = process_roll_images.prepare_roll_image(
+                DRUID, source_filepath, "88-note"
+            )
+        self.assertEqual(source_filepath, Path(f"images/{DRUID}.jp2"))
+        self.assertEqual(source_filepath.read_bytes(), b"jp2")
+        convert.assert_called_once_with(
+            Path(f"images/{DRUID}.jp2"),
+            Path(f"images/{DRUID}.tiff.part"),
+            flip_top_bottom=True,
+            flip_left_right=False,
+        )
+        self.assertEqual(image_filepath, Path(f"images/{DRUID}.tiff"))
+        np.testing.assert_array_equal(tifffile.imread(image_filepath), self.image)
+
+    def range_start(self, part_index):
+        """Returns the offset of a part of a parallel download of the image."""
+
+        parts = process_roll_images.PARALLEL_DOWNLOAD_PARTS
+        return -(-len(self.image_data) // parts) * part_index
+
+    def parallel_get(
+        self, response, parts, failing_range_start=None, wrong_range_start=None
+    ):
+        """Returns a mock of SESSION.get that answers the image request with
+        response and each range request with a 206 response for that range
+        (appended to parts), except that reading the range starting at
+        failing_range_start fails, and that the range starting at
+        wrong_range_start is answered with a different range."""
+
+        def get(url, stream, headers):
+            if "Range" not in headers:
+                return response
+            start, end = map(int, headers["Range"][len("bytes=") :].split("-"))
+            part = make_response(206, self.image_data[start : end + 1])
+            part.headers["Content-Range"] = (
+                f"bytes {start}-{end}/{len(self.image_data)}"
+            )
+            if start == failing_range_start:
+                part.raw = mock.Mock()
+                part.raw.read.side_effect = IOError("reset")
+            if start == wrong_range_start:
+                part.headers["Content-Range"] = f"bytes 0-{end - start}/*"
+                part.raw = BytesIO(self.image_data[: end - start + 1])
+            parts.append(part)
+            return part
+
+        return get
+
+    def test_parallel_download(self):
+        """A large image is downloaded in parallel ranges when the server
+        accepts range requests, without reading the original response."""
+
+        response = make_response(200, self.image_data)
+        response.headers["Accept-Ranges"] = "bytes"
+        response.raw = mock.Mock()
+        parts = []
+        self.session.get.side_effect = self.parallel_get(response, parts)
+        with mock.patch.object(process_roll_images, "PARALLEL_DOWNLOAD_MIN_SIZE", 0):
+            image_filepath = get_roll_image(DRUID, IMAGE_URL, "welte-red")
+        self.assertEqual(len(parts), process_roll_images.PARALLEL_DOWNLOAD_PARTS)
+        for call in self.session.get.call_args_list[1:]:
+            self.assertEqual(call[1]["headers"]["If-Range"], '"abc"')
+        for part in parts:
+            part.close.assert_called()
+        response.raw.read.assert_not_called()
+        self.assertEqual(image_filepath.read_bytes(), self.image_data)
+        self.assertEqual(list(Path("images").glob("*.part")), [])
+
+    def test_failed_parallel_download_falls_back_to_single_stream(self):
+        """If one part of a parallel download fails, the other parts are
+        finished with (and closed), and the image is downloaded from the
+        original response instead."""
+
+        response = make_response(200, self.image_data)
+        response.headers["Accept-Ranges"] = "bytes"
+        parts = []
+        self.session.get.side_effect = self.parallel_get(
+            response, parts, failing_range_start=self.range_start(2)
+        )
+        with mock.patch.object(process_roll_images, "PARALLEL_DOWNLOAD_MIN_SIZE", 0):
+            image_filepath = get_roll_image(DRUID, IMAGE_URL, "welte-red")
+        self.assertEqual(len(parts), process_roll_images.PARALLEL_DOWNLOAD_PARTS)
+        for part in parts:
+            part.close.assert_called()
+        self.assertEqual(image_filepath.read_bytes(), self.image_data)
+        self.assertEqual(list(Path("images").glob("*.part")), [])
+
+    def test_mismatched_range_falls_back_to_single_stream(self):
+        """A part whose Content-Range isn't the range that was requested is
+        never written into the image; the image is downloaded from the
+        original response instead."""
+
+        response = make_response(200, self.image_data)
+        response.headers["Accept-Ranges"] = "bytes"
+        parts = []
+        self.session.get.side_effect = self.parallel_get(
+            response, parts, wrong_range_start=self.range_start(3)
+        )
+        with mock.patch.object(process_roll_images, "PARALLEL_DOWNLOAD_MIN_SIZE", 0):
+            image_filepath = get_roll_image(DRUID, IMAGE_URL, "welte-red")
+        for part in parts:
+            part.close.assert_called()
+        self.assertEqual(image_filepath.read_bytes(), self.image_data)
+
+
+class FlipImageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.image_filepath = Path(self.tmpdir.name) / "image.tiff"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_compressed_images_are_mirrored(self):
+        """Compressed images can't be memory-mapped, so they are decoded
+        (which needs imagecodecs for most compression schemes), mirrored and
+        written back out uncompressed."""
+
+        image = np.arange(6 * 10 * 3, dtype=np.uint8).reshape(6, 10, 3)
+        for compression in ("lzw", "packbits", "zlib"):
+            for photometric, image_array in (
+                ("minisblack", image[..., 0]),
+                ("rgb", image),
+            ):
+                with self.subTest(compression=compression, photometric=photometric):
+                    tifffile.imwrite(
+                        self.image_filepath,
+                        image_array,
+                        photometric=photometric,
+                        compression=compression,
+                        metadata=None,
+                    )
+                    process_roll_images.flip_image_left_right(self.image_filepath)
+                    with tifffile.TiffFile(self.image_filepath) as tiff:
+                        page = tiff.pages[0]
+                        self.assertEqual(page.compression, tifffile.COMPRESSION.NONE)
+                        self.assertEqual(page.photometric.name.lower(), photometric)
+                        np.testing.assert_array_equal(
+                            page.asarray(), np.fliplr(image_array)
+                        )
+
+    def test_bit_reversed_bytes(self):
+        for byte in range(256):
+            bits = np.unpackbits(np.uint8(byte))
+            self.assertEqual(
+                process_roll_images.BIT_REVERSED_BYTES[byte],
+                np.packbits(bits[::-1])[0],
+            )
+
+    def test_bilevel_images_are_mirrored(self):
+        """Uncompressed 1-bit images are mirrored by reversing the bits of
+        each row of the packed data, including rows whose width isn't a
+        multiple of 8 (so they end with padding bits)."""
+
+        rng = np.random.default_rng(0)
+        for width in (8, 13, 21):
+            image = rng.random((9, width)) > 0.5
+            for photometric in ("minisblack", "miniswhite"):
+                # Several strips, mirrored in blocks of one row or all at once
+                for rowsperstrip in (2, None):
+                    for block_size in (1, process_roll_images.FLIP_BLOCK_SIZE):
+                        with self.subTest(
+                            width=width,
+                            photometric=photometric,
+                            rowsperstrip=rowsperstrip,
+                            block_size=block_size,
+                        ), mock.patch.object(
+                            process_roll_images,
+                            "flip_bilevel_image_left_right",
+                            wraps=process_roll_images.flip_bilevel_image_left_right,
+                        ) as flip_bilevel_image_left_right, mock.patch.object(
+                            process_roll_images, "FLIP_BLOCK_SIZE", block_size
+                        ):
+                            tifffile.imwrite(
+                                self.image_filepath,
+                                image,
+                                photometric=photometric,
+                                rowsperstrip=rowsperstrip,
+                                metadata=None,
+                            )
+                            process_roll_images.flip_image_left_right(
+                                self.image_filepath
+                            )
+                            flip_bilevel_image_left_right.assert_called_once()
+                            with tifffile.TiffFile(self.image_filepath) as tiff:
+                                page = tiff.pages[0]
+                                self.assertEqual(
+                                    page.photometric.name.lower(), photometric
+                                )
+                                np.testing.assert_array_equal(
+                                    page.asarray(), np.fliplr(image)
+                                )
+
+    def test_reversed_fill_order_bilevel_image_is_mirrored(self):
+        """A 1-bit image with the bits of each byte in reverse order
+        (FillOrder 2) is decoded and mirrored instead."""
+
+        image = np.random.default_rng(0).random((9, 13)) > 0.5
+        # tifffile doesn't write the FillOrder tag, so it is written as
+        # CellLength (265, the preceding tag number) and renumbered
+        tifffile.imwrite(
+            self.image_filepath,
+            image,
+            photometric="miniswhite",
+            extratags=[(265, "H", 1, 2, True)],
+            metadata=None,
+        )
+        tag = b"\x09\x01\x03\x00\x01\x00\x00\x00\x02\x00"
+        image_data = self.image_filepath.read_bytes()
+        self.assertEqual(image_data.count(tag), 1)
+        self.image_filepath.write_bytes(image_data.replace(tag, b"\x0a" + tag[1:]))
+        with tifffile.TiffFile(self.image_filepath) as tiff:
+            self.assertEqual(tiff.pages[0].fillorder, 2)
+            image = tiff.pages[0].asarray()
+
+        with mock.patch.object(
+            process_roll_images, "flip_bilevel_image_left_right"
+        ) as flip_bilevel_image_left_right:
+            process_roll_images.flip_image_left_right(self.image_filepath)
+        flip_bilevel_image_left_right.assert_not_called()
+        with tifffile.TiffFile(self.image_filepath) as tiff:
+            page = tiff.pages[0]
+            self.assertEqual(page.photometric, tifffile.PHOTOMETRIC.MINISWHITE)
+            np.testing.assert_array_equal(page.asarray(), np.fliplr(image))
+
+
+# ROLL_TYPE_ENTRIES before variants differing only by trailing periods were
+# merged
+LISTED_ROLL_TYPE_ENTRIES = {
+    "Welte-Mignon red roll (T-100)": "welte-red",
+    "Welte-Mignon red roll (T-100).": "welte-red",
+    "Welte-Mignon red roll (T-100)..": "welte-red",
+    "Scale: 88n": "88-note",
+    "Scale: 88n.": "88-note",
+    "Scale: 65n.": "65-note",
+    "88n": "88-note",
+    "65n": "65-note",
+    "standard": "88-note",
+    "non-reproducing": "88-note",
+    "Welte-Mignon green roll (T-98)": "welte-green",
+    "Welte-Mignon green roll (T-98).": "welte-green",
+    "Welte-Mignon licensee roll": "welte-licensee",
+    "Welte-Mignon licensee roll.": "welte-licensee",
+    "Welte-Mignon licensee roll (T-98).": "welte-licensee",
+    "Duo-Art piano rolls": "duo-art",
+    "Duo-Art piano rolls.": "duo-art",
+}
+
+MODS_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<publicObject id="druid:{druid}">
+  <mods xmlns="http://www.loc.gov/mods/v3">
+    <physicalDescription>{physical_description}</physicalDescription>
+    {notes}
+  </mods>
+</publicObject>
+"""
+
+
+class GetRollTypeTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        os.mkdir("xml")
+
+    def tearDown(self):
+        process_roll_images.load_mods_tree.cache_clear()
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def get_roll_type(self, physical_description="", notes=""):
+        Path(f"xml/{DRUID}.xml").write_text(
+            MODS_TEMPLATE.format(
+                druid=DRUID, physical_description=physical_description, notes=notes
+            )
+        )
+        process_roll_images.load_mods_tree.cache_clear()
+        return process_roll_images.get_roll_type_for_druid(DRUID, False)
+
+    def test_note_variants_match_listed_entries(self):
+        """Every note listed in the table before its trailing-period variants
+        were merged still gives the same roll type, with or without a trailing
+        period, wherever it appears in the MODS record."""
+
+        for text, roll_type in LISTED_ROLL_TYPE_ENTRIES.items():
+            label = text.rstrip(".")
+            for variant in (label, label + ".", label + ".."):
+                for location, physical_description, notes in (
+                    (
+                        "roll type",
+                        f'<note displayLabel="Roll type">{variant}</note>',
+                        "",
+                    ),
+                    ("scale", f'<note displayLabel="Scale">{variant}</note>', ""),
+                    ("note", "", f"<note>{variant}</note>"),
+                ):
+                    with self.subTest(note=variant, location=location):
+                        self.assertEqual(
+                            self.get_roll_type(physical_description, notes),
+                            roll_type,
+                        )
+
+    def test_specific_note_overrides_88_note_scale(self):
+        self.assertEqual(
+            self.get_roll_type(
+                '<note displayLabel="Roll type">standard</note>'
+                '<note displayLabel="Scale">88n.</note>',
+                "<note>Scale: 88n.</note><note>Welte-Mignon licensee roll.</note>",
+            ),
+            "welte-licensee",
+        )
+
+
+def find_midi_sections_with_regex(analysis_filepath):
+    """Extracts the MIDI sections of an analysis report as
+    extract_midi_from_analysis() originally did, by reading the whole report as
+    text and searching it with regular expressions."""
+
+    with open(analysis_filepath, "r") as analysis_file:
+        contents = analysis_file.read()
+    midi_data = {}
+    for header, midi_type in process_roll_images.ANALYSIS_MIDI_SECTIONS.items():
+        match = re.search(rf"^{header}$(.*)", contents, re.M | re.S)
+        if match is not None:
+            midi_data[midi_type] = match.group(1).split("\n@")[0]
+    return midi_data
+
+
+class ExtractMidiTest(unittest.TestCase):
+    REPORTS = {
+        "report": (
+            "@@BEGIN: ANALYSIS\n@ARGS: -m\n@HOLE_MIDIFILE:\n"
+            '"MThd"\n4\'6\n\n@MIDIFILE:\n"MThd"\n4\'6\n2\'0\n\n@@END: ANALYSIS\n'
+        ),
+        "missing section": '@ARGS: -m\n@MIDIFILE:\n"MThd"\n\n@@END: ANALYSIS\n',
+        "section at the end": "@ARGS: -m\n@HOLE_MIDIFILE:\n1\n\n@MIDIFILE:\n2\n\n",
+        "no final newline": "@HOLE_MIDIFILE:\n1\n@MIDIFILE:\n2",
+        "header at the end": "@HOLE_MIDIFILE:\n1\n@MIDIFILE:",
+        "empty section": "@HOLE_MIDIFILE:\n@MIDIFILE:\n2\n@END\n",
+        "repeated section": "@HOLE_MIDIFILE:\n1\n@HOLE_MIDIFILE:\n3\n@MIDIFILE:\n2\n",
+        "header within lines": (
+            "x@HOLE_MIDIFILE:\n@HOLE_MIDIFILE: \n@HOLE_MIDIFILE:\n1 @MIDIFILE:\n"
+            "@MIDIFILE:\n2\n"
+        ),
+        "CRLF": "@ARGS: -m\r\n@HOLE_MIDIFILE:\r\n1\r\n\r\n@MIDIFILE:\r\n2\r\n\r\n",
+        "CR": "@HOLE_MIDIFILE:\r1\r@MIDIFILE:\r2\r",
+    }
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmpdir.name)
+        os.mkdir("txt")
+        self.analysis_filepath = Path(f"txt/{DRUID}.txt")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def extract_midi(self):
+        """Returns the binasc data extract_midi_from_analysis() converts for
+        the report in txt/, keyed by MIDI type."""
+
+        with mock.patch.object(
+            process_roll_images, "convert_binasc_to_midi"
+        ) as convert_binasc_to_midi:
+            process_roll_images.extract_midi_from_analysis(DRUID, True, "binasc")
+        return {
+            call.args[2]: call.args[0] for call in convert_binasc_to_midi.call_args_list
+        }
+
+    def test_sections_match_regex_extraction(self):
+        for name, report in self.REPORTS.items():
+            with self.subTest(report=name):
+                self.analysis_filepath.write_bytes(report.encode())
+                expected = find_midi_sections_with_regex(self.analysis_filepath)
+                self.assertEqual(
+                    process_roll_images.find_midi_sections(report.encode()),
+                    expected,
+                )
+                # Nothing is converted unless both sections are present
+                self.assertEqual(
+                    self.extract_midi(),
+                    expected if len(expected) == 2 else {},
+                )
+
+    def test_streamed_sections_match_whole_report_sections(self):
+        """The sections collected from the parser output as it arrives are the
+        same as those found in the whole report, however the output is split
+        into chunks."""
+
+        for name, report in self.REPORTS.items():
+            report = report.encode()
+            for chunk_size in (1, 2, 3, 5, len(report)):
+                with self.subTest(report=name, chunk_size=chunk_size):
+                    chunks = [
+                        report[i : i + chunk_size]
+                        for i in range(0, len(report), chunk_size)
+                    ]
+                    analysis_file = BytesIO()
+                    self.assertEqual(
+                        process_roll_images.tee_midi_sections(
+                            iter(chunks), analysis_file
+                        ),
+                        process_roll_images.find_midi_sections(report),
+                    )
+                    self.assertEqual(analysis_file.getvalue(), report)
+
+    def parse_roll_image(self, report, exit_status):
+        """Runs parse_roll_image() with a stand-in for tiff2holes that outputs
+        the report and exits with the given status."""
+
+        os.mkdir("logs")
+        Path("report").write_text(report)
+        tiff2holes = Path("tiff2holes")
+        tiff2holes.write_text(f"#!/bin/sh\ncat report\nexit {exit_status}\n")
+        tiff2holes.chmod(0o755)
+        return process_roll_images.parse_roll_image(
+            DRUID, Path("image.tiff"), "welte-red", False, "./tiff2holes", True, False
+        )
+
+    def test_parsed_image_sections_are_returned(self):
+        report = self.REPORTS["report"]
+        self.assertEqual(
+            self.parse_roll_image(report, 0),
+            process_roll_images.find_midi_sections(report.encode()),
+        )
+        self.assertEqual(self.analysis_filepath.read_text(), report)
+
+    def test_failed_parse_leaves_no_report(self):
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(self.parse_roll_image(self.REPORTS["report"], 1))
+        self.assertFalse(self.analysis_filepath.exists())
+
+    def test_empty_report(self):
+        self.analysis_filepath.touch()
+        with self.assertLogs(level="ERROR"):
+            self.assertEqual(self.extract_midi(), {})
+
+
+class ArgumentsTest(unittest.TestCase):
+    def test_jobs_must_be_positive(self):
+        self.assertEqual(process_roll_images.positive_int("4"), 4)
+        for value in ("0", "-1", "x"):
+            with self.subTest(value=value), self.assertRaises(
+                (argparse.ArgumentTypeError, ValueError)
+            ):
+                process_roll_images.positive_int(value)
+
+
+if __name__ == "__main__":
+    unittest.main()